@@ -0,0 +1,139 @@
+"""Two-layer in-process response cache for the Gemini generator functions.
+
+Layer 1 is an exact lookup on a hash of the normalized call parameters
+(sub-millisecond). Layer 2 embeds the normalized parameters with the Gemini
+embedding model and compares against stored embeddings by cosine similarity,
+so differently-phrased but equivalent requests (e.g. "Paris, France" vs
+"paris") can still hit. Entries expire per-cache via a TTL so time-sensitive
+sections like the weather forecast stay fresh.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from functools import wraps
+from typing import List, Optional
+
+import google.generativeai as genai
+
+# Embedding model used for the similarity layer.
+_EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Cosine similarity above which two requests are treated as asking for the
+# same thing.
+_SIMILARITY_THRESHOLD = 0.93
+
+# Error responses are returned as plain strings by the generators; they must
+# not be cached, or a transient failure would be replayed for the whole TTL.
+_ERROR_PREFIXES = ("API not configured", "An error occurred", "Could not")
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(x * x for x in b))
+    if norm_a == 0.0 or norm_b == 0.0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def _normalized_key(func_name: str, args: tuple, kwargs: dict) -> str:
+    """Builds a canonical key string from the call parameters.
+
+    String parameters are lowercased and whitespace-collapsed so trivial
+    variations of the same destination map to the same key.
+    """
+    parts = [func_name]
+    values = list(args) + [kwargs[name] for name in sorted(kwargs)]
+    for value in values:
+        if isinstance(value, str):
+            value = " ".join(value.strip().lower().split())
+        parts.append(str(value))
+    return "|".join(parts)
+
+
+class SemanticCache:
+    """Holds cached responses with their embeddings for one generator."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, response_text, embedding or None)
+        self._entries = {}
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get_exact(self, key: str) -> Optional[str]:
+        self._purge_expired()
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def get_similar(self, embedding: List[float]) -> Optional[str]:
+        best_text = None
+        best_similarity = 0.0
+        for _, text, stored_embedding in self._entries.values():
+            if stored_embedding is None:
+                continue
+            similarity = _cosine_similarity(embedding, stored_embedding)
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_text = text
+        if best_similarity >= _SIMILARITY_THRESHOLD:
+            return best_text
+        return None
+
+    def put(self, key: str, text: str, embedding: Optional[List[float]]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, text, embedding)
+
+
+async def _embed(key_text: str) -> Optional[List[float]]:
+    """Embeds the key text with the async client.
+
+    The async client is required, not just preferred: genai is configured
+    with the grpc_asyncio transport, which the sync embed_content client
+    cannot drive from inside a running event loop.
+    """
+    try:
+        result = await genai.embed_content_async(
+            model=_EMBEDDING_MODEL, content=key_text
+        )
+        return result["embedding"]
+    except Exception as e:
+        logging.warning(f"Embedding failed; skipping semantic cache layer: {e}")
+        return None
+
+
+def cached(ttl_seconds: int):
+    """Decorator adding a two-layer response cache to an async generator function."""
+    cache = SemanticCache(ttl_seconds)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key_text = _normalized_key(func.__name__, args, kwargs)
+            key = hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+            hit = cache.get_exact(key)
+            if hit is not None:
+                logging.info(f"Cache hit (exact) for {func.__name__}.")
+                return hit
+
+            embedding = await _embed(key_text)
+            if embedding is not None:
+                hit = cache.get_similar(embedding)
+                if hit is not None:
+                    logging.info(f"Cache hit (similarity) for {func.__name__}.")
+                    return hit
+
+            text = await func(*args, **kwargs)
+            if not text.startswith(_ERROR_PREFIXES):
+                cache.put(key, text, embedding)
+            return text
+
+        return wrapper
+
+    return decorator
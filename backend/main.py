@@ -1,10 +1,21 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import google.generativeai as genai
+import aiobreaker
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 import os
 from dotenv import load_dotenv
+import asyncio
 import datetime
+import json
 import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from cache import cached
 
 # --- Configuration ---
 
@@ -20,21 +31,131 @@ api_key = os.getenv("GOOGLE_API_KEY")
 # Flag to track if API key is configured successfully
 api_configured = False
 
-# Configure the generative AI client on startup
-if not api_key:
-    logging.error("Error: GOOGLE_API_KEY not found in environment variables. Please create a `.env` file with your key.")
-else:
+# Model instances cached at module scope; constructing a GenerativeModel on
+# every request re-parses config for no benefit on a latency-bound path.
+_MODELS: dict = {}
+
+# Cap on Gemini calls in flight across all requests, so bursts reuse the
+# shared channel instead of oversubscribing it. Created in the lifespan so it
+# binds to the event loop uvicorn actually runs.
+_MAX_CONCURRENT_GEMINI_CALLS = 32
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+
+# One in-flight set of section tasks per unique trip request: concurrent
+# duplicates await the same tasks instead of each fanning out their own four
+# Gemini calls, whichever endpoint they arrive on. The lock, like the
+# semaphore, is created in the lifespan to bind to the right event loop.
+_inflight_plans: dict = {}
+_inflight_lock: Optional[asyncio.Lock] = None
+
+# Section keys in response order, with the labels used in error strings.
+_SECTION_LABELS = {
+    "flight_suggestions": "flight suggestion",
+    "itinerary": "itinerary",
+    "recommendations": "recommendation",
+    "weather_forecast": "weather forecast",
+}
+
+
+def _configure_genai() -> None:
+    """Configures the Gemini client once, on a shared async gRPC channel.
+
+    With grpc_asyncio all model calls multiplex over one channel instead of
+    creating transports per call, which matters once the four per-request
+    calls run concurrently across many in-flight requests.
+    """
+    global api_configured
+    if not api_key:
+        logging.error("Error: GOOGLE_API_KEY not found in environment variables. Please create a `.env` file with your key.")
+        return
     try:
-        genai.configure(api_key=api_key)
+        genai.configure(api_key=api_key, transport="grpc_asyncio")
+        _MODELS["gemini-1.5-flash"] = genai.GenerativeModel(model_name="gemini-1.5-flash")
         api_configured = True
         logging.info("Google Generative AI configured successfully.")
     except Exception as e:
         logging.error(f"Error configuring Google Generative AI: {e}")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _gemini_semaphore, _inflight_lock
+    _gemini_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_GEMINI_CALLS)
+    _inflight_lock = asyncio.Lock()
+    _configure_genai()
+    yield
+
+# Static instruction blocks, one per generator. They are sent verbatim as the
+# first part of every request, with the trip-specific details appended in a
+# short trailing block, so the large shared prefix stays byte-identical across
+# calls and Gemini's implicit prompt caching can reuse it.
+FLIGHTS_SYSTEM_PROMPT = """As a travel planning AI, suggest potential flight options for a trip.
+Use the trip details given at the end of this message.
+Please provide suggestions that align with the traveler's stated budget.
+
+Suggest a few possible airlines, potential layover cities (if applicable), and a general idea of what one might expect regarding flight duration or typical costs for this route and budget.
+Emphasize that these are *suggestions based on general knowledge* and that users should perform a real-time flight search for accurate prices and availability.
+
+Present the response clearly using Markdown."""
+
+ITINERARY_SYSTEM_PROMPT = """Create a detailed travel itinerary for a trip, using the destination, dates and budget given at the end of this message.
+
+Provide a day-by-day plan including:
+- Suggested activities for morning, afternoon, and evening (suitable for the stated budget).
+- Recommendations for places to visit (landmarks, museums, parks, etc.) - mention cost implications if relevant to the budget.
+- Optional: Suggestions for local food or restaurants to try that fit the budget.
+- Optional: Basic tips for getting around (e.g., public transport, walking) that are budget-conscious.
+
+Format the output clearly, perhaps using Markdown with headings for each day.
+Be creative and provide practical suggestions for a memorable trip."""
+
+RECOMMENDATIONS_SYSTEM_PROMPT = """You are an expert Restaurant & Hotel Planner.
+Your job is to provide Restaurant & Hotel recommendations for the location and budget given at the end of this message.
+
+- For Restaurants: Provide Top 5 restaurants that fit the budget, with address and a general idea of average cost or cuisine type. Include a rating if available or inferable.
+- For Hotels: Provide Top 5 hotels that fit the budget, with address and a general idea of average cost per night or star rating. Include a rating if available or inferable.
+
+Return the response using Markdown for clear formatting."""
+
+WEATHER_SYSTEM_PROMPT = """You are an expert weather forecaster and travel advisor. Your job is to provide a detailed weather forecast and suggest appropriate clothing to pack for a trip to the location given at the end of this message.
+Provide the forecast for the next 7 days, starting from today's date.
+Include details such as:
+- Daily temperature range (High/Low)
+- Precipitation (chance of rain/snow)
+- Humidity
+- Wind conditions
+- Air Quality (if available or inferable)
+- Cloud Cover
+
+Based on this 7-day forecast, provide a clear and concise suggestion for the type of clothing and gear someone should pack for the trip during this period. Consider layering if temperatures vary.
+
+Present the response clearly using Markdown, with a section for the daily forecast and a separate section for clothing suggestions."""
+
+# Generation configs are immutable, so build them once instead of per call.
+# Output tokens are the dominant latency term, so each cap is sized to what
+# the section actually needs rather than a generic ceiling.
+_FLIGHTS_CONFIG = genai.types.GenerationConfig(
+    temperature=0.6,
+    max_output_tokens=700
+)
+_ITINERARY_CONFIG = genai.types.GenerationConfig(
+    temperature=0.7,
+    max_output_tokens=2048  # day-by-day plans legitimately run long
+)
+_RECOMMENDATIONS_CONFIG = genai.types.GenerationConfig(
+    temperature=0.7,
+    max_output_tokens=1200  # top-5 restaurants + top-5 hotels fits easily
+)
+_WEATHER_CONFIG = genai.types.GenerationConfig(
+    temperature=0.4,
+    max_output_tokens=1000  # 7 daily entries plus packing suggestions
+)
+
 # --- FastAPI App Instance ---
 app = FastAPI(
     title="AI Ultimate Travel Planner API",
-    description="API to generate trip plans including flights, itinerary, recommendations, and weather forecasts using Google Gemini."
+    description="API to generate trip plans including flights, itinerary, recommendations, and weather forecasts using Google Gemini.",
+    lifespan=lifespan
 )
 
 # --- Pydantic Model for Request Body ---
@@ -47,236 +168,434 @@ class TripRequest(BaseModel):
 
 # --- Helper Functions (Adapted for FastAPI) ---
 
+_BUDGETS = {
+    1: "Budget-Friendly",
+    2: "Mid-Range",
+    3: "Luxury",
+}
+
 def get_budget_description(budget_level: int) -> str:
     """Maps budget level integer to a descriptive string."""
-    if budget_level == 1:
-        return "Budget-Friendly"
-    elif budget_level == 2:
-        return "Mid-Range"
-    elif budget_level == 3:
-        return "Luxury"
-    else:
-        return "Any Budget" # Default or unexpected case
-
-async def generate_flight_suggestions(source: str, destination: str, start_date: datetime.date, end_date: datetime.date, budget_level_desc: str, model_name: str = "gemini-1.5-flash") -> str:
+    return _BUDGETS.get(budget_level, "Any Budget") # Default covers unexpected levels
+
+# --- Prompt builders (shared by the interactive and batch endpoints) ---
+
+def _flight_contents(source: str, destination: str, start_date: str, end_date: str, budget_level_desc: str) -> list:
+    """Builds the [static prefix, trip details] contents for flight suggestions."""
+    trip_details = (
+        f"Source: {source}\n"
+        f"Destination: {destination}\n"
+        f"Departure date: {start_date}\n"
+        f"Return date: {end_date}\n"
+        f"Budget: {budget_level_desc}"
+    )
+    return [FLIGHTS_SYSTEM_PROMPT, trip_details]
+
+def _itinerary_contents(destination: str, start_date: str, end_date: str, budget_level_desc: str) -> list:
+    """Builds the [static prefix, trip details] contents for the itinerary."""
+    duration = (datetime.date.fromisoformat(end_date) - datetime.date.fromisoformat(start_date)).days + 1
+    trip_details = (
+        f"Destination: {destination}\n"
+        f"Start date: {start_date}\n"
+        f"End date: {end_date}\n"
+        f"Duration: {duration} days\n"
+        f"Budget: {budget_level_desc}"
+    )
+    return [ITINERARY_SYSTEM_PROMPT, trip_details]
+
+def _recommendations_contents(location: str, budget_level_desc: str) -> list:
+    """Builds the [static prefix, trip details] contents for recommendations."""
+    trip_details = (
+        f"Location: {location}\n"
+        f"Budget: {budget_level_desc}"
+    )
+    return [RECOMMENDATIONS_SYSTEM_PROMPT, trip_details]
+
+def _weather_contents(location: str) -> list:
+    """Builds the [static prefix, trip details] contents for the weather forecast."""
+    return [WEATHER_SYSTEM_PROMPT, f"Location: {location}"]
+
+# Trips after 10 consecutive Gemini failures and fails fast for 30s, so an
+# outage is surfaced immediately instead of every request waiting out its
+# client-side timeout.
+_gemini_breaker = aiobreaker.CircuitBreaker(fail_max=10, timeout_duration=datetime.timedelta(seconds=30))
+
+
+@_gemini_breaker
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.5, max=4),
+    retry=retry_if_exception_type((google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable)),
+    reraise=True
+)
+async def _generate_with_retry(model, contents: list, generation_config):
     """
-    Generates AI-based flight suggestions.
+    Raw model call with bounded exponential backoff plus jitter on rate
+    limits (429) and transient unavailability (503). The semaphore sits
+    inside so its permit is released between attempts.
     """
-    if not api_configured:
-        return "API not configured. Cannot generate flight suggestions."
-
-    try:
-        prompt = f"""
-        As a travel planning AI, suggest potential flight options for a trip from {source} to {destination}.
-        The desired departure date is {start_date.strftime('%Y-%m-%d')} and the return date is {end_date.strftime('%Y-%m-%d')}.
-        Please provide suggestions that align with a **{budget_level_desc} budget**.
-
-        Suggest a few possible airlines, potential layover cities (if applicable), and a general idea of what one might expect regarding flight duration or typical costs for this route and budget.
-        Emphasize that these are *suggestions based on general knowledge* and that users should perform a real-time flight search for accurate prices and availability.
-
-        Present the response clearly using Markdown.
-        """
-
-        logging.info(f"Generating {budget_level_desc} flight suggestions from {source} to {destination} using {model_name}...")
-        model = genai.GenerativeModel(model_name=model_name)
-        generation_config = genai.types.GenerationConfig(
-            temperature=0.6,
-            max_output_tokens=700
-        )
-        response = await model.generate_content_async( # Use async version
-            contents=[prompt],
+    async with _gemini_semaphore:
+        return await model.generate_content_async( # Use async version
+            contents=contents,
             generation_config=generation_config
         )
 
+
+async def _call_gemini(contents: list, *, generation_config, label: str, model_name: str = "gemini-1.5-flash") -> str:
+    """
+    Shared Gemini call path for all generators: concurrency gating, retry,
+    circuit breaking, the response.parts guard, logging, and error-to-string
+    conversion. An open circuit breaker propagates as an exception so the
+    endpoints can answer 503 instead of returning it as section text.
+    """
+    try:
+        model = _MODELS[model_name]
+        response = await _generate_with_retry(model, contents, generation_config)
+
         if response.parts:
-            logging.info("Flight suggestions generated successfully.")
+            logging.info(f"{label.capitalize()} generated successfully.")
             return response.text
         else:
             logging.warning("Received an empty response or content was blocked.")
-            return f"Could not generate flight suggestions. The response was empty or blocked. (Feedback: {response.prompt_feedback})"
+            return f"Could not generate {label}. The response was empty or blocked. (Feedback: {response.prompt_feedback})"
 
+    except aiobreaker.CircuitBreakerError:
+        raise
     except Exception as e:
-        logging.error(f"An error occurred during flight suggestion generation: {e}")
-        return f"An error occurred during flight suggestion generation: {e}"
+        logging.error(f"An error occurred during {label} generation: {e}")
+        return f"An error occurred during {label} generation: {e}"
+
+@cached(ttl_seconds=6 * 3600)  # routes and fares drift, so refresh every 6h
+async def generate_flight_suggestions(source: str, destination: str, start_date: str, end_date: str, budget_level_desc: str, model_name: str = "gemini-1.5-flash") -> str:
+    """
+    Generates AI-based flight suggestions.
+    """
+    if not api_configured:
+        return "API not configured. Cannot generate flight suggestions."
 
+    logging.info(f"Generating {budget_level_desc} flight suggestions from {source} to {destination} using {model_name}...")
+    return await _call_gemini(
+        _flight_contents(source, destination, start_date, end_date, budget_level_desc),
+        generation_config=_FLIGHTS_CONFIG,
+        label="flight suggestions",
+        model_name=model_name
+    )
 
-async def generate_travel_itinerary(destination: str, start_date: datetime.date, end_date: datetime.date, budget_level_desc: str, model_name: str = "gemini-1.5-flash") -> str:
+@cached(ttl_seconds=24 * 3600)  # itineraries are stable day to day
+async def generate_travel_itinerary(destination: str, start_date: str, end_date: str, budget_level_desc: str, model_name: str = "gemini-1.5-flash") -> str:
     """
     Generates a travel itinerary using the Gemini model, considering budget.
     """
     if not api_configured:
         return "API not configured. Cannot generate itinerary."
 
-    try:
-        duration = (end_date - start_date).days + 1
-        prompt = f"""Create a detailed travel itinerary for a trip to {destination}.
-        The trip starts on {start_date.strftime('%Y-%m-%d')} and ends on {end_date.strftime('%Y-%m-%d')}, lasting for {duration} days.
-        Please plan the trip with a **{budget_level_desc} budget** in mind.
-
-        Provide a day-by-day plan including:
-        - Suggested activities for morning, afternoon, and evening (suitable for a {budget_level_desc} budget).
-        - Recommendations for places to visit (landmarks, museums, parks, etc.) - mention cost implications if relevant to the budget.
-        - Optional: Suggestions for local food or restaurants to try that fit a {budget_level_desc} budget.
-        - Optional: Basic tips for getting around (e.g., public transport, walking) that are budget-conscious.
-
-        Format the output clearly, perhaps using Markdown with headings for each day.
-        Be creative and provide practical suggestions for a memorable trip.
-        """
-
-        logging.info(f"Generating {budget_level_desc} itinerary for {destination} from {start_date} to {end_date} using {model_name}...")
-        model = genai.GenerativeModel(model_name=model_name)
-        generation_config = genai.types.GenerationConfig(
-            temperature=0.7,
-            max_output_tokens=2048
-        )
-        response = await model.generate_content_async( # Use async version
-            contents=[prompt],
-            generation_config=generation_config
-        )
-
-        if response.parts:
-            logging.info("Itinerary generated successfully.")
-            return response.text
-        else:
-            logging.warning("Received an empty response or content was blocked.")
-            return f"Could not generate itinerary. The response was empty or blocked. (Feedback: {response.prompt_feedback})"
-
-    except Exception as e:
-        logging.error(f"An error occurred during itinerary generation: {e}")
-        return f"An error occurred during itinerary generation: {e}"
+    logging.info(f"Generating {budget_level_desc} itinerary for {destination} from {start_date} to {end_date} using {model_name}...")
+    return await _call_gemini(
+        _itinerary_contents(destination, start_date, end_date, budget_level_desc),
+        generation_config=_ITINERARY_CONFIG,
+        label="itinerary",
+        model_name=model_name
+    )
 
+@cached(ttl_seconds=24 * 3600)  # restaurant/hotel picks are stable day to day
 async def generate_recommendations(location: str, budget_level_desc: str, model_name: str = "gemini-1.5-flash") -> str:
-     """
-     Generates restaurant and hotel recommendations using the Gemini model, considering budget.
-     """
-     if not api_configured:
-         return "API not configured. Cannot generate recommendations."
-
-     try:
-         prompt = f"""
-         You are an expert Restaurant & Hotel Planner.
-         Your job is to provide Restaurant & Hotel recommendations for {location}.
-         Please provide recommendations specifically for a **{budget_level_desc} budget**.
-
-         - For Restaurants: Provide Top 5 restaurants that fit a {budget_level_desc} budget, with address and a general idea of average cost or cuisine type. Include a rating if available or inferable.
-         - For Hotels: Provide Top 5 hotels that fit a {budget_level_desc} budget, with address and a general idea of average cost per night or star rating. Include a rating if available or inferable.
-
-         Return the response using Markdown for clear formatting.
-         """
-
-         logging.info(f"Generating {budget_level_desc} recommendations for {location} using {model_name}...")
-         model = genai.GenerativeModel(model_name=model_name)
-         generation_config = genai.types.GenerationConfig(
-             temperature=0.7,
-             max_output_tokens=2048
-         )
-         response = await model.generate_content_async( # Use async version
-             contents=[prompt],
-             generation_config=generation_config
-         )
-
-         if response.parts:
-             logging.info("Recommendations generated successfully.")
-             return response.text
-         else:
-             logging.warning("Received an empty response or content was blocked.")
-             return f"Could not generate recommendations. The response was empty or blocked. (Feedback: {response.prompt_feedback})"
-
-     except Exception as e:
-         logging.error(f"An error occurred during recommendation generation: {e}")
-         return f"An error occurred during recommendation generation: {e}"
+    """
+    Generates restaurant and hotel recommendations using the Gemini model, considering budget.
+    """
+    if not api_configured:
+        return "API not configured. Cannot generate recommendations."
+
+    logging.info(f"Generating {budget_level_desc} recommendations for {location} using {model_name}...")
+    return await _call_gemini(
+        _recommendations_contents(location, budget_level_desc),
+        generation_config=_RECOMMENDATIONS_CONFIG,
+        label="recommendations",
+        model_name=model_name
+    )
 
+@cached(ttl_seconds=3600)  # forecasts go stale quickly, keep only 1h
 async def get_weather_forecast(location: str, model_name: str = "gemini-1.5-flash") -> str:
-     """
-     Gets a weather forecast and clothing suggestions using the Gemini model based on a prompt.
-     """
-     if not api_configured:
-         return "API not configured. Cannot get weather forecast or clothing suggestions."
-
-     try:
-         prompt = f"""
-         You are an expert weather forecaster and travel advisor. Your job is to provide a detailed weather forecast and suggest appropriate clothing to pack for a trip to {location}.
-         Provide the forecast for the next 7 days, starting from today's date.
-         Include details such as:
-         - Daily temperature range (High/Low)
-         - Precipitation (chance of rain/snow)
-         - Humidity
-         - Wind conditions
-         - Air Quality (if available or inferable)
-         - Cloud Cover
-
-         Based on this 7-day forecast, provide a clear and concise suggestion for the type of clothing and gear someone should pack for their trip to {location} during this period. Consider layering if temperatures vary.
-
-         Present the response clearly using Markdown, with a section for the daily forecast and a separate section for clothing suggestions.
-         """
-
-         logging.info(f"Getting weather forecast and clothing suggestions for {location} using {model_name}...")
-         model = genai.GenerativeModel(model_name=model_name)
-         generation_config = genai.types.GenerationConfig(
-             temperature=0.4,
-             max_output_tokens=1500
-         )
-         response = await model.generate_content_async( # Use async version
-             contents=[prompt],
-             generation_config=generation_config
-         )
-
-         if response.parts:
-             logging.info("Weather forecast and clothing suggestions generated successfully.")
-             return response.text
-         else:
-             logging.warning("Received an empty response or content was blocked.")
-             return f"Could not get weather forecast and clothing suggestions. The response was empty or blocked. (Feedback: {response.prompt_feedback})"
-
-     except Exception as e:
-         logging.error(f"An error occurred during weather forecasting and clothing suggestions: {e}")
-         return f"An error occurred during weather forecasting and clothing suggestions: {e}"
+    """
+    Gets a weather forecast and clothing suggestions using the Gemini model based on a prompt.
+    """
+    if not api_configured:
+        return "API not configured. Cannot get weather forecast or clothing suggestions."
+
+    logging.info(f"Getting weather forecast and clothing suggestions for {location} using {model_name}...")
+    return await _call_gemini(
+        _weather_contents(location),
+        generation_config=_WEATHER_CONFIG,
+        label="weather forecast",
+        model_name=model_name
+    )
 
 # --- API Endpoint ---
 
+async def _plan_section_tasks(source: str, destination: str, start_str: str, end_str: str, budget_level_desc: str) -> dict:
+    """
+    Returns the four section tasks for a trip, creating them only if no
+    identical request is already in flight.
+
+    The tasks are shared between concurrent duplicates (on both the JSON and
+    streaming endpoints), so callers must await them through asyncio.shield -
+    one disconnecting client must not cancel generation for the others. A
+    cleanup task drops the map entry and retrieves any exceptions once every
+    section has settled.
+    """
+    key = (
+        source.strip().lower(),
+        destination.strip().lower(),
+        start_str,
+        end_str,
+        budget_level_desc
+    )
+
+    async with _inflight_lock:
+        tasks = _inflight_plans.get(key)
+        if tasks is not None:
+            logging.info(f"Joining in-flight plan generation for {key}.")
+            return tasks
+
+        # All four calls are independent network-bound Gemini requests, so
+        # run them concurrently; wall-clock time collapses to the slowest.
+        tasks = {
+            "flight_suggestions": asyncio.create_task(
+                generate_flight_suggestions(source, destination, start_str, end_str, budget_level_desc)
+            ),
+            "itinerary": asyncio.create_task(
+                generate_travel_itinerary(destination, start_str, end_str, budget_level_desc)
+            ),
+            "recommendations": asyncio.create_task(
+                generate_recommendations(destination, budget_level_desc)
+            ),
+            "weather_forecast": asyncio.create_task(
+                get_weather_forecast(destination)
+            ),
+        }
+        _inflight_plans[key] = tasks
+
+    async def _cleanup():
+        # Retrieving the results here also consumes any exceptions, so a
+        # failed plan with no remaining awaiters doesn't log "Future
+        # exception was never retrieved".
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        async with _inflight_lock:
+            _inflight_plans.pop(key, None)
+
+    asyncio.create_task(_cleanup())
+    return tasks
+
+
+async def _generate_plan(source: str, destination: str, start_str: str, end_str: str, budget_level_desc: str) -> dict:
+    """
+    Awaits the four (possibly shared) section tasks and assembles the plan dict.
+    """
+    tasks = await _plan_section_tasks(source, destination, start_str, end_str, budget_level_desc)
+    results = dict(zip(tasks, await asyncio.gather(
+        *(asyncio.shield(tasks[section]) for section in tasks),
+        return_exceptions=True
+    )))
+
+    # An open circuit breaker means Gemini is down across the board; fail the
+    # whole request fast with a 503 rather than returning four error sections.
+    for result in results.values():
+        if isinstance(result, aiobreaker.CircuitBreakerError):
+            raise HTTPException(status_code=503, detail="Gemini is temporarily unavailable (circuit breaker open). Please retry in a moment.")
+
+    # A failure in one call should not poison the other three; surface it as
+    # an error string in that section only, matching the generators' own
+    # error-reporting style.
+    def _result_or_error(result, label: str) -> str:
+        if isinstance(result, BaseException):
+            logging.error(f"An error occurred during {label} generation: {result}")
+            return f"An error occurred during {label} generation: {result}"
+        return result
+
+    # Return results in the specified order
+    return {
+        section: _result_or_error(result, _SECTION_LABELS[section])
+        for section, result in results.items()
+    }
+
+
 @app.post("/plan_trip/")
 async def plan_trip(request: TripRequest):
     """
     Generates a complete trip plan including flight suggestions, itinerary,
     recommendations, and weather forecast based on user input.
+
+    Identical requests arriving while a plan is still being generated join
+    the in-flight generation instead of starting their own.
     """
     if not api_configured:
          raise HTTPException(status_code=503, detail="Google Generative AI API is not configured.")
 
     budget_level_desc = get_budget_description(request.budget_level)
+    # Format the dates once; isoformat is a C fast path and every prompt
+    # builder needs the same strings.
+    start_str = request.start_date.isoformat()
+    end_str = request.end_date.isoformat()
 
-    # Generate results sequentially
-    flight_suggestions = await generate_flight_suggestions(
-        request.source,
-        request.destination,
-        request.start_date,
-        request.end_date,
-        budget_level_desc
-    )
+    return await _generate_plan(request.source, request.destination, start_str, end_str, budget_level_desc)
 
-    itinerary = await generate_travel_itinerary(
-        request.destination,
-        request.start_date,
-        request.end_date,
-        budget_level_desc
-    )
+# --- Batch Mode ("queued plan") endpoints ---
 
-    recommendations = await generate_recommendations(
-        request.destination,
-        budget_level_desc
-    )
+# Queued jobs keyed by our job_id -> server-side batch job name. Held in
+# process memory like the response cache; jobs do not survive a restart.
+_BATCH_JOBS: dict = {}
 
-    weather_forecast = await get_weather_forecast(
-        request.destination
-    )
+# Section order must match the order prompts are submitted in below.
+_BATCH_SECTIONS = ["flight_suggestions", "itinerary", "recommendations", "weather_forecast"]
 
-    # Return results in the specified order
-    return {
-        "flight_suggestions": flight_suggestions,
-        "itinerary": itinerary,
-        "recommendations": recommendations,
-        "weather_forecast": weather_forecast
-    }
+# Job states that mean the batch will never produce results.
+_BATCH_TERMINAL_FAILURES = {"JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+_batch_client = None
+
+
+def _get_batch_client():
+    """
+    Returns a google-genai client for Batch Mode, created on first use.
+
+    Batch Mode only exists in the newer google-genai SDK; the interactive
+    endpoints still run on google-generativeai, so this client is kept
+    separate and only built when a queued plan is requested.
+    """
+    global _batch_client
+    if _batch_client is None:
+        from google import genai as genai_batch_sdk
+        _batch_client = genai_batch_sdk.Client(api_key=api_key)
+    return _batch_client
+
+
+@app.post("/plan_trip/batch")
+async def plan_trip_batch(request: TripRequest):
+    """
+    Submits the four plan prompts as one Gemini Batch Mode job and returns a
+    job_id to poll via GET /plan_trip/batch/{job_id}. Batch Mode is roughly
+    half the token price of interactive calls at the cost of minutes of
+    turnaround, which suits plans requested ahead of time.
+    """
+    if not api_configured:
+         raise HTTPException(status_code=503, detail="Google Generative AI API is not configured.")
+
+    budget_level_desc = get_budget_description(request.budget_level)
+    start_str = request.start_date.isoformat()
+    end_str = request.end_date.isoformat()
+    section_contents = [
+        _flight_contents(request.source, request.destination, start_str, end_str, budget_level_desc),
+        _itinerary_contents(request.destination, start_str, end_str, budget_level_desc),
+        _recommendations_contents(request.destination, budget_level_desc),
+        _weather_contents(request.destination),
+    ]
+
+    try:
+        client = _get_batch_client()
+        batch_job = await client.aio.batches.create(
+            model="gemini-1.5-flash",
+            src=[
+                {"contents": [{"role": "user", "parts": [{"text": part} for part in contents]}]}
+                for contents in section_contents
+            ],
+            config={"display_name": f"plan-trip-{request.destination}"},
+        )
+    except Exception as e:
+        logging.error(f"Could not submit batch job: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not submit batch job: {e}")
+
+    job_id = uuid.uuid4().hex
+    _BATCH_JOBS[job_id] = batch_job.name
+    logging.info(f"Submitted batch job {batch_job.name} as {job_id}.")
+    return {"job_id": job_id, "status": "pending"}
+
+
+@app.get("/plan_trip/batch/{job_id}")
+async def plan_trip_batch_status(job_id: str):
+    """
+    Returns the status of a queued plan, including the four sections once the
+    batch job has finished.
+    """
+    batch_name = _BATCH_JOBS.get(job_id)
+    if batch_name is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job id.")
+
+    try:
+        client = _get_batch_client()
+        batch_job = await client.aio.batches.get(name=batch_name)
+    except Exception as e:
+        logging.error(f"Could not fetch batch job {batch_name}: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not fetch batch job: {e}")
+
+    state = batch_job.state.name if batch_job.state else "JOB_STATE_UNSPECIFIED"
+    if state in _BATCH_TERMINAL_FAILURES:
+        # The job will never produce results; drop the handle and tell the
+        # client so it stops polling.
+        _BATCH_JOBS.pop(job_id, None)
+        logging.error(f"Batch job {batch_name} ended in {state}: {batch_job.error}")
+        return {"job_id": job_id, "status": state, "error": f"The queued plan ended in {state}. Please submit it again. ({batch_job.error})"}
+    if state != "JOB_STATE_SUCCEEDED":
+        return {"job_id": job_id, "status": state}
+
+    inlined = (batch_job.dest.inlined_responses if batch_job.dest else None) or []
+    results = {}
+    for section, item in zip(_BATCH_SECTIONS, inlined):
+        if item.response is not None:
+            results[section] = item.response.text
+        else:
+            results[section] = f"Could not generate {section}. (Error: {item.error})"
+
+    # The job is done and delivered; drop the handle so the map stays bounded.
+    _BATCH_JOBS.pop(job_id, None)
+    return {"job_id": job_id, "status": state, "results": results}
+
+
+@app.post("/plan_trip/stream")
+async def plan_trip_stream(request: TripRequest):
+    """
+    Streams the trip plan as newline-delimited JSON, emitting each section
+    ({"section": ..., "text": ...}) as soon as its Gemini call finishes so the
+    client can render results incrementally instead of waiting for all four.
+    """
+    if not api_configured:
+         raise HTTPException(status_code=503, detail="Google Generative AI API is not configured.")
+
+    # Fail fast like /plan_trip/ does rather than starting a stream whose
+    # every section would immediately fail.
+    if _gemini_breaker.current_state == aiobreaker.CircuitBreakerState.OPEN:
+        raise HTTPException(status_code=503, detail="Gemini is temporarily unavailable (circuit breaker open). Please retry in a moment.")
+
+    budget_level_desc = get_budget_description(request.budget_level)
+    start_str = request.start_date.isoformat()
+    end_str = request.end_date.isoformat()
+
+    tasks = await _plan_section_tasks(request.source, request.destination, start_str, end_str, budget_level_desc)
+
+    async def _tagged(section: str, task) -> tuple:
+        label = _SECTION_LABELS[section]
+        try:
+            return section, await asyncio.shield(task)
+        except aiobreaker.CircuitBreakerError:
+            # An outage is not section text; let it abort the stream below.
+            raise
+        except Exception as e:
+            logging.error(f"An error occurred during {label} generation: {e}")
+            return section, f"An error occurred during {label} generation: {e}"
+
+    wrapped = [asyncio.ensure_future(_tagged(section, task)) for section, task in tasks.items()]
+
+    async def _stream():
+        try:
+            for future in asyncio.as_completed(wrapped):
+                section, text = await future
+                yield json.dumps({"section": section, "text": text}) + "\n"
+        except aiobreaker.CircuitBreakerError:
+            # The breaker opened mid-stream; headers are already sent, so
+            # abort the response instead of dressing the outage up as text.
+            for future in wrapped:
+                future.cancel()
+            raise
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
 
 # --- Root endpoint for health checks ---
 @app.get("/")
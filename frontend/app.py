@@ -1,7 +1,10 @@
 import streamlit as st
 import requests
+import httpx
+import asyncio
 import json
 import datetime
+import re
 from dateutil.parser import parse
 import pandas as pd
 import time
@@ -52,18 +55,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # API endpoint URL - use environment variable with fallback
-API_ENDPOINT = os.environ.get("API_URL", "http://127.0.0.1:8000")
+API_BASE = os.environ.get("API_URL", "http://127.0.0.1:8000")
 
 # Add a trailing slash to the endpoint if it doesn't exist
-if not API_ENDPOINT.endswith('/'):
-    API_ENDPOINT += '/'
+if not API_BASE.endswith('/'):
+    API_BASE += '/'
 
-# Create the full endpoint URL
-API_ENDPOINT += "plan_trip/"
+# Create the full endpoint URLs
+API_ENDPOINT = API_BASE + "plan_trip/"
+STREAM_ENDPOINT = API_BASE + "plan_trip/stream"
+BATCH_ENDPOINT = API_BASE + "plan_trip/batch"
+
+# Compiled once; Streamlit reruns this script on every widget interaction
+_JSON_BLOCK_RE = re.compile(r'```json\n(.*?)\n```', re.DOTALL)
+
+# The four plan sections, in display order, with their headings
+PLAN_SECTIONS = [
+    ("flight_suggestions", "## ✈️ Flight Suggestions"),
+    ("itinerary", "## 🗓️ Trip Itinerary"),
+    ("recommendations", "## 🍽️ Recommendations"),
+    ("weather_forecast", "## 🌤️ Weather Forecast"),
+]
 
 # Debug information
 st.sidebar.markdown("### Debug Info")
-st.sidebar.write(f"API Endpoint: {API_ENDPOINT}")
+st.sidebar.write(f"API Endpoint: {STREAM_ENDPOINT}")
 
 # Title and intro
 st.title("✈️ AI Ultimate Travel Planner")
@@ -99,6 +115,11 @@ with st.form(key="trip_form"):
         default_end_date = start_date + datetime.timedelta(days=7) if start_date else datetime.date.today() + datetime.timedelta(days=7)
         end_date = st.date_input("End Date", value=default_end_date, min_value=start_date if start_date else datetime.date.today())
     
+    batch_mode = st.checkbox(
+        "Save 50% with a queued plan (results in a few minutes)",
+        help="Uses Gemini Batch Mode, which costs about half as much but takes minutes instead of seconds."
+    )
+
     submit_button = st.form_submit_button(label="Plan My Trip!")
 
 # Create variable for displaying results
@@ -135,14 +156,13 @@ def display_results(response_data):
         st.markdown(text)
         
         # Try to find and parse any JSON content
-        import re
-        json_matches = re.findall(r'```json\n(.*?)\n```', text, re.DOTALL)
-        
+        json_matches = _JSON_BLOCK_RE.findall(text)
+
         if json_matches:
             for json_str in json_matches:
                 try:
                     data = json.loads(json_str)
-                    
+
                     # Check if the data contains restaurants
                     if isinstance(data, dict) and "restaurants" in data:
                         st.subheader("Top Restaurants")
@@ -176,14 +196,13 @@ def display_results(response_data):
         st.markdown(text)
         
         # Try to find and parse any JSON content
-        import re
-        json_matches = re.findall(r'```json\n(.*?)\n```', text, re.DOTALL)
-        
+        json_matches = _JSON_BLOCK_RE.findall(text)
+
         if json_matches:
             for json_str in json_matches:
                 try:
                     data = json.loads(json_str)
-                    
+
                     # Check if the data contains forecast
                     if isinstance(data, dict) and "forecast" in data:
                         st.subheader("7-Day Forecast")
@@ -201,34 +220,107 @@ def display_results(response_data):
 if submit_button:
     if not source or not destination:
         st.error("Please provide both departure city and destination!")
+    elif batch_mode:
+        # Queue the plan via Batch Mode and poll for it with the button below
+        payload = {
+            "source": source,
+            "destination": destination,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "budget_level": budget_level[0]
+        }
+        try:
+            response = requests.post(BATCH_ENDPOINT, json=payload, timeout=30)
+            if response.status_code == 200:
+                st.session_state.batch_job_id = response.json()["job_id"]
+                st.session_state.show_results = False
+                st.info("Your plan is queued! ⏳ Check back in a few minutes using the button below.")
+            else:
+                st.error(f"Error: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Error connecting to the API. Make sure your FastAPI server is running. Error: {e}")
+            st.error(f"API URL being used: {BATCH_ENDPOINT}")
     else:
-        with st.spinner("🌍 Planning your dream trip... Please wait!"):
-            # Prepare payload
-            payload = {
-                "source": source,
-                "destination": destination,
-                "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat(),
-                "budget_level": budget_level[0]  # Extract the numeric value from the tuple
-            }
-            
-            try:
-                # Call the API
-                response = requests.post(API_ENDPOINT, json=payload, timeout=180)
-                
-                if response.status_code == 200:
-                    # Store the results in session state
-                    st.session_state.response_data = response.json()
-                    st.session_state.show_results = True
-                    st.success("Your travel plan is ready! 🎉")
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Error connecting to the API. Make sure your FastAPI server is running. Error: {e}")
-                st.error(f"API URL being used: {API_ENDPOINT}")
-
-# Display results if available
-if st.session_state.show_results and hasattr(st.session_state, 'response_data'):
+        # Prepare payload
+        payload = {
+            "source": source,
+            "destination": destination,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "budget_level": budget_level[0]  # Extract the numeric value from the tuple
+        }
+
+        status = st.status("🌍 Planning your dream trip...", expanded=True)
+
+        # Lay out one placeholder per section so each can be filled in
+        # the moment the backend streams it, instead of waiting for all
+        # four to finish.
+        placeholders = {}
+        for section_key, heading in PLAN_SECTIONS:
+            st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
+            st.markdown("<div class='plan-section'>", unsafe_allow_html=True)
+            st.markdown(heading)
+            placeholders[section_key] = st.empty()
+            placeholders[section_key].markdown("*Generating...*")
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        async def _consume_stream():
+            # Streams NDJSON sections from the backend, rendering each one
+            # the moment it arrives and ticking the status box.
+            results = {key: "Not generated." for key, _ in PLAN_SECTIONS}
+            ready = 0
+            async with httpx.AsyncClient(timeout=180) as client:
+                async with client.stream("POST", STREAM_ENDPOINT, json=payload) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        raise RuntimeError(f"{response.status_code} - {body}")
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        item = json.loads(line)
+                        results[item["section"]] = item["text"]
+                        placeholders[item["section"]].markdown(item["text"])
+                        ready += 1
+                        status.write(f"✅ {dict(PLAN_SECTIONS)[item['section']].lstrip('# ')}")
+                        status.update(label=f"🌍 Planning your dream trip... ({ready}/{len(PLAN_SECTIONS)} sections ready)")
+            return results
+
+        try:
+            # Drive the async stream to completion on this script run
+            st.session_state.response_data = asyncio.run(_consume_stream())
+            st.session_state.show_results = True
+            status.update(label="Your travel plan is ready! 🎉", state="complete", expanded=False)
+        except RuntimeError as e:
+            status.update(label="Planning failed", state="error")
+            st.error(f"Error: {e}")
+        except httpx.HTTPError as e:
+            status.update(label="Planning failed", state="error")
+            st.error(f"Error connecting to the API. Make sure your FastAPI server is running. Error: {e}")
+            st.error(f"API URL being used: {STREAM_ENDPOINT}")
+
+# Poll a queued plan, if one is pending
+if st.session_state.get("batch_job_id") and st.button("Check queued plan status"):
+    try:
+        response = requests.get(f"{BATCH_ENDPOINT}/{st.session_state.batch_job_id}", timeout=30)
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("results"):
+                st.session_state.response_data = data["results"]
+                st.session_state.show_results = True
+                del st.session_state["batch_job_id"]
+                st.success("Your travel plan is ready! 🎉")
+            elif data.get("error"):
+                del st.session_state["batch_job_id"]
+                st.error(data["error"])
+            else:
+                st.info(f"Still working on it... (status: {data['status']})")
+        else:
+            st.error(f"Error: {response.status_code} - {response.text}")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error connecting to the API. Make sure your FastAPI server is running. Error: {e}")
+
+# Display results if available (streaming already rendered them on submit runs)
+if st.session_state.show_results and hasattr(st.session_state, 'response_data') and not submit_button:
     display_results(st.session_state.response_data)
 
 # Add a footer